@@ -0,0 +1,188 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from auth.routes import is_catalog_fresh
+from catalog import get_catalog_index
+from collections import deque
+from typing import Optional
+import anyio
+import asyncio
+import math
+import time
+import re
+
+# Route classes and their admission settings. max_concurrency is the hard cap,
+# the adaptive limit moves between min_concurrency and it based on latency.
+ROUTE_CLASSES = {
+    "auth-cpu": {"max_concurrency": 8, "min_concurrency": 2, "max_queue": 32, "queue_timeout": 2.0, "target_latency": 0.5, "shed_status": 429},
+    "compute": {"max_concurrency": 4, "min_concurrency": 1, "max_queue": 16, "queue_timeout": 5.0, "target_latency": 5.0, "shed_status": 503},
+    "db-read": {"max_concurrency": 16, "min_concurrency": 4, "max_queue": 128, "queue_timeout": 1.0, "target_latency": 0.2, "shed_status": 503},
+    "db-write": {"max_concurrency": 8, "min_concurrency": 2, "max_queue": 64, "queue_timeout": 1.0, "target_latency": 0.3, "shed_status": 503},
+    "cache-read": {"max_concurrency": 24, "min_concurrency": 8, "max_queue": 256, "queue_timeout": 0.5, "target_latency": 0.05, "shed_status": 503},
+}
+
+# Sync routes share one anyio threadpool. Sizing it to the sum of the caps
+# means every admitted request gets a thread, so classes never queue behind
+# each other there.
+THREADPOOL_TOKENS = sum(settings["max_concurrency"] for settings in ROUTE_CLASSES.values())
+
+def _catalog_route_class() -> str:
+    # A stale catalog means this request runs the HF fetch, KMeans and index build
+    return "cache-read" if is_catalog_fresh() else "compute"
+
+def _job_submit_route_class() -> str:
+    # With the catalog loaded a submit is just a hash and one insert
+    return "db-write" if get_catalog_index() is not None else "compute"
+
+# (method, path pattern, route class or a callable picking one); the first match wins
+ROUTE_RULES = [
+    ("POST", re.compile(r"^/auth/(login|register|refresh)$"), "auth-cpu"),
+    ("POST", re.compile(r"^/auth/datasets/impact$"), "compute"),
+    ("POST", re.compile(r"^/auth/datasets/impact/jobs$"), _job_submit_route_class),
+    ("GET", re.compile(r"^/auth/datasets/impact/jobs/.+$"), "db-read"),
+    ("GET", re.compile(r"^/auth/datasets/cache_status$"), "cache-read"),
+    ("GET", re.compile(r"^/auth/datasets$"), _catalog_route_class),
+    ("GET", re.compile(r"^/datasets/.+/similar$"), _catalog_route_class),
+    ("GET", re.compile(r"^/(auth/me|user/followed|datasets/combinations)$"), "db-read"),
+    ("POST", re.compile(r"^/(user/follow|datasets/combine)$"), "db-write"),
+    ("DELETE", re.compile(r"^/user/follow/.+$"), "db-write"),
+    ("GET", re.compile(r"^/(user/cache_status|admission/stats|profiles/.+)$"), "cache-read"),
+]
+
+LATENCY_EWMA_ALPHA = 0.2
+LIMIT_DECREASE_FACTOR = 0.9
+
+def classify_route(method: str, path: str) -> Optional[str]:
+    for rule_method, pattern, route_class in ROUTE_RULES:
+        if method == rule_method and pattern.match(path):
+            return route_class() if callable(route_class) else route_class
+    return None
+
+def configure_threadpool():
+    """Size anyio's default threadpool to the admission caps; call from the event loop."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TOKENS
+
+class AdaptiveLimiter:
+    """Concurrency limiter with a bounded wait queue and an AIMD limit.
+
+    The limit grows additively while the latency average stays under target
+    and shrinks multiplicatively when it goes over. All state is touched from
+    the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, max_concurrency, min_concurrency, max_queue, queue_timeout, target_latency, shed_status):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.shed_status = shed_status
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.latency_ewma = None
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._waiters = deque()
+
+    async def acquire(self) -> bool:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the timeout fired
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self.shed_timeout += 1
+                return False
+        except asyncio.CancelledError:
+            # Client went away while queued; give back any slot already handed over
+            if waiter.done():
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+        return True
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        # Hand freed slots straight to queued requests while under the limit
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft().set_result(None)
+
+    def release(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += LATENCY_EWMA_ALPHA * (latency - self.latency_ewma)
+        if self.latency_ewma > self.target_latency:
+            self.limit = max(self.min_concurrency, self.limit * LIMIT_DECREASE_FACTOR)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._release_slot()
+
+    def retry_after(self) -> int:
+        latency = self.latency_ewma or self.target_latency
+        return max(1, math.ceil(latency * (len(self._waiters) + 1) / max(int(self.limit), 1)))
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed_queue_full + self.shed_timeout,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+            "target_latency_ms": self.target_latency * 1000,
+        }
+
+_limiters = {name: AdaptiveLimiter(**settings) for name, settings in ROUTE_CLASSES.items()}
+
+class AdmissionControlMiddleware:
+    """Admit each request through its route class's limiter, shedding early when full."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route_class = classify_route(scope["method"], scope["path"])
+        if route_class is None:
+            return await self.app(scope, receive, send)
+
+        limiter = _limiters[route_class]
+        if not await limiter.acquire():
+            response = JSONResponse(
+                {"detail": f"Server busy ({route_class}), retry later"},
+                status_code=limiter.shed_status,
+                headers={"Retry-After": str(limiter.retry_after())},
+            )
+            return await response(scope, receive, send)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+router = APIRouter(tags=["admission"])
+
+@router.get("/admission/stats")
+def admission_stats():
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Depends, Request, Header,
 from sqlmodel import Session, select
 from models import User
 from database import engine
+from profiling import span
+from catalog import IMPACT_METHODS, build_catalog_index, get_catalog_index, score_impacts
 from .utils import get_password_hash, create_tokens, verify_password, verify_token
 from pydantic import BaseModel, EmailStr
 from typing import Optional
@@ -9,8 +11,6 @@ import httpx
 import time
 import datetime
 import math
-from sklearn.cluster import KMeans, DBSCAN
-import numpy as np
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -42,7 +42,7 @@ class RefreshResponse(BaseModel):
     token_type: str = "bearer"
 
 class ImpactRequest(BaseModel):
-    datasets: list
+    datasets: list  # dataset ids, or feature dicts for datasets outside the catalog
     method: str = 'naive'  # 'naive' or 'advanced'
 
 # Dependency to get current user from JWT token
@@ -176,45 +176,17 @@ def refresh_token(data: RefreshRequest = Body(...)):
 
 @router.post("/datasets/impact")
 async def assess_impact(data: ImpactRequest = Body(...)):
-    datasets = data.datasets
     method = data.method
-    results = []
-    explanation = ""
-
-    if method == 'naive':
-        explanation = "Naive impact is assigned based on size_mb: <100MB=low, <1000MB=medium, >=1000MB=high."
-        for ds in datasets:
-            size_mb = ds.get('size_mb', 0)
-            if size_mb < 100:
-                impact = 'low'
-            elif size_mb < 1000:
-                impact = 'medium'
-            else:
-                impact = 'high'
-            results.append({"id": ds.get("id"), "impact": impact, "explanation": explanation})
-    elif method == 'advanced':
-        explanation = "Advanced impact uses KMeans clustering on [size_mb, num_rows, num_columns]; outliers (top 5% farthest from cluster center) are 'high impact'."
-        features = [
-            [ds.get('size_mb', 0), ds.get('num_rows', 0), ds.get('num_columns', 0)]
-            for ds in datasets
-        ]
-        X = np.array(features)
-        if len(X) >= 3:
-            kmeans = KMeans(n_clusters=3, random_state=0)
-            labels = kmeans.fit_predict(X)
-            distances = np.linalg.norm(X - kmeans.cluster_centers_[labels], axis=1)
-            threshold = np.percentile(distances, 95)
-            for i, ds in enumerate(datasets):
-                if distances[i] > threshold:
-                    impact = 'high impact'
-                else:
-                    impact = 'normal'
-                results.append({"id": ds.get("id"), "impact": impact, "explanation": explanation})
-        else:
-            for ds in datasets:
-                results.append({"id": ds.get("id"), "impact": "normal", "explanation": "Not enough data for clustering."})
-    else:
+    if method not in IMPACT_METHODS:
         return {"error": "Unknown method. Use 'naive' or 'advanced'."}
+
+    # Ids resolve from the catalog and advanced scores are relative to it;
+    # naive scoring of feature dicts needs neither
+    needs_catalog = method == 'advanced' or any(isinstance(ds, str) for ds in data.datasets)
+    if needs_catalog and get_catalog_index() is None:
+        await get_hf_datasets()
+
+    results = score_impacts(data.datasets, method)
     return {"results": results, "method": method}
 
 # Global cache
@@ -224,6 +196,9 @@ _hf_cache = {
 }
 CACHE_TTL = 30 * 60  # 30 minutes in seconds
 
+def is_catalog_fresh() -> bool:
+    return bool(_hf_cache["data"]) and time.time() - _hf_cache["timestamp"] < CACHE_TTL
+
 def get_impact_label_from_size_category(size_category):
     if "10K<n<100K" in size_category:
         return "low"
@@ -246,16 +221,17 @@ def generate_mock_metadata(ds):
 @router.get("/datasets", tags=["public"])
 async def get_hf_datasets():
     now = time.time()
-    if _hf_cache["data"] and (now - _hf_cache["timestamp"] < CACHE_TTL):
+    if is_catalog_fresh():
         time_left = CACHE_TTL - (now - _hf_cache["timestamp"])
         print(f"[CACHE] Returning cached datasets. Time left: {math.ceil(time_left)} seconds")
         return _hf_cache["data"]
 
     url = "https://huggingface.co/api/datasets"
     async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        datasets = response.json()
+        with span("hf_fetch", sampled=False):
+            response = await client.get(url)
+            response.raise_for_status()
+            datasets = response.json()
         trimmed = []
         features = []
         for ds in datasets:
@@ -272,24 +248,12 @@ async def get_hf_datasets():
                 "num_columns": meta["num_columns"],
             })
 
-        # Clustering (KMeans example)
-        X = np.array(features)
-        if len(X) >= 3:  # KMeans needs at least as many samples as clusters
-            kmeans = KMeans(n_clusters=3, random_state=0)
-            labels = kmeans.fit_predict(X)
-            # Compute distances to cluster centers
-            distances = np.linalg.norm(X - kmeans.cluster_centers_[labels], axis=1)
-            threshold = np.percentile(distances, 95)  # top 5% as outliers
-            for i, ds in enumerate(trimmed):
-                ds["cluster"] = int(labels[i])
-                if distances[i] > threshold:
-                    ds["impact"] = "high impact"
-                else:
-                    ds["impact"] = "normal"
-        else:
-            for ds in trimmed:
-                ds["cluster"] = 0
-                ds["impact"] = "normal"
+        # Keep the feature matrix around as a nearest-neighbour index and
+        # precompute impact scores for this generation
+        index = build_catalog_index(trimmed, features)
+        for i, ds in enumerate(trimmed):
+            ds["cluster"] = index["clusters"][i]
+            ds["impact"] = index["impacts"]["advanced"][i]
 
         _hf_cache["data"] = trimmed
         _hf_cache["timestamp"] = now
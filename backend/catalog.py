@@ -0,0 +1,196 @@
+from sklearn.cluster import KMeans
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler
+from dotenv import load_dotenv
+from typing import List, Optional, Tuple
+from profiling import span
+import numpy as np
+import hashlib
+import json
+import os
+
+# Load environment variables
+load_dotenv()
+
+# Extend the [size_mb, num_rows, num_columns] features with log-scaled
+# download and like counts when building the similarity index.
+SIMILARITY_INCLUDE_POPULARITY = os.getenv("SIMILARITY_INCLUDE_POPULARITY", "true").lower() == "true"
+SIMILARITY_LEAF_SIZE = 40
+
+IMPACT_METHODS = ("naive", "advanced")
+NAIVE_EXPLANATION = "Naive impact is assigned based on size_mb: <100MB=low, <1000MB=medium, >=1000MB=high."
+ADVANCED_EXPLANATION = "Advanced impact assigns each dataset to the nearest of 3 KMeans clusters fitted on the catalog's [size_mb, num_rows, num_columns]; datasets farther from their center than the catalog's top 5% are 'high impact'."
+
+# Current catalog index. Each refresh builds a new snapshot and swaps it in,
+# so readers never see a half-built index.
+_catalog = {
+    "index": None,
+    "generation": 0,
+}
+
+def naive_impact(size_mb: float) -> str:
+    if size_mb < 100:
+        return 'low'
+    elif size_mb < 1000:
+        return 'medium'
+    return 'high'
+
+def cluster_impacts(X: np.ndarray) -> Tuple[List[int], List[str], Optional[dict]]:
+    """Fit KMeans on X and flag the top 5% farthest from their centre as 'high impact'.
+
+    Returns (labels, impacts, model); model is None when there are too few
+    rows to cluster.
+    """
+    if len(X) < 3:  # KMeans needs at least as many samples as clusters
+        return [0] * len(X), ["normal"] * len(X), None
+    with span("kmeans"):
+        kmeans = KMeans(n_clusters=3, random_state=0)
+        labels = kmeans.fit_predict(X)
+    distances = np.linalg.norm(X - kmeans.cluster_centers_[labels], axis=1)
+    threshold = np.percentile(distances, 95)
+    impacts = ["high impact" if distance > threshold else "normal" for distance in distances]
+    return [int(label) for label in labels], impacts, {"kmeans": kmeans, "threshold": threshold}
+
+def predict_impacts(model: dict, X: np.ndarray) -> List[str]:
+    """Score datasets outside the catalog against the catalog's fitted clusters."""
+    labels = model["kmeans"].predict(X)
+    distances = np.linalg.norm(X - model["kmeans"].cluster_centers_[labels], axis=1)
+    return ["high impact" if distance > model["threshold"] else "normal" for distance in distances]
+
+def build_catalog_index(datasets: List[dict], features: List[list]) -> dict:
+    """Scale the catalog feature matrix, build a KD-tree over it and score impact."""
+    X = np.array(features, dtype=float).reshape(-1, 3)
+
+    # Impact for every supported method is computed once per generation
+    clusters, advanced, impact_model = cluster_impacts(X)
+    impacts = {
+        "naive": [naive_impact(row[0]) for row in X],
+        "advanced": advanced,
+    }
+
+    if SIMILARITY_INCLUDE_POPULARITY and len(X):
+        popularity = np.array(
+            [[ds.get("downloads") or 0, ds.get("likes") or 0] for ds in datasets],
+            dtype=float,
+        )
+        X = np.hstack([X, np.log1p(popularity)])
+
+    ids = [ds["id"] for ds in datasets]
+    # Identifies this catalog content across restarts, unlike the generation counter
+    fingerprint = hashlib.sha256(json.dumps([ids, X.tolist()]).encode()).hexdigest()
+    if len(X):
+        with span("similarity_index"):
+            X_scaled = StandardScaler().fit_transform(X)
+            tree = KDTree(X_scaled, leaf_size=SIMILARITY_LEAF_SIZE)
+    else:
+        X_scaled = X
+        tree = None
+
+    index = {
+        "generation": _catalog["generation"] + 1,
+        "fingerprint": fingerprint,
+        "ids": ids,
+        "datasets": datasets,
+        "positions": {dataset_id: i for i, dataset_id in enumerate(ids)},
+        "X": X_scaled,
+        "tree": tree,
+        "clusters": clusters,
+        "impacts": impacts,
+        "impact_model": impact_model,
+    }
+    _catalog["index"] = index
+    _catalog["generation"] = index["generation"]
+    return index
+
+def get_catalog_index() -> Optional[dict]:
+    return _catalog["index"]
+
+def get_catalog_generation() -> int:
+    return _catalog["generation"]
+
+def lookup_impact(dataset_id: str, method: str, index: Optional[dict] = None) -> Optional[str]:
+    """Return the precomputed impact of a catalog dataset, or None if unknown."""
+    if index is None:
+        index = _catalog["index"]
+    if index is None or dataset_id not in index["positions"]:
+        return None
+    return index["impacts"][method][index["positions"][dataset_id]]
+
+def score_impacts(datasets: list, method: str, index: Optional[dict] = None) -> List[dict]:
+    """Score a mix of catalog ids and feature dicts with the given impact method.
+
+    Catalog datasets resolve from the scores precomputed at refresh time;
+    anything else is scored on the fly from the features the client sent.
+    Advanced impact is always relative to the catalog, so callers should
+    make sure it is loaded first. Pass index to score against a fixed snapshot.
+    """
+    if index is None:
+        index = _catalog["index"]
+    explanation = NAIVE_EXPLANATION if method == 'naive' else ADVANCED_EXPLANATION
+    results = []
+    missing = []
+    for ds in datasets:
+        dataset_id = ds if isinstance(ds, str) else ds.get("id")
+        impact = lookup_impact(dataset_id, method, index)
+        if impact is not None:
+            results.append({"id": dataset_id, "impact": impact, "explanation": explanation})
+        elif isinstance(ds, str):
+            results.append({"id": dataset_id, "impact": None, "explanation": "Dataset not in catalog and no features provided."})
+        else:
+            results.append(None)
+            missing.append((len(results) - 1, ds))
+
+    if missing:
+        X = np.array([
+            [ds.get('size_mb', 0), ds.get('num_rows', 0), ds.get('num_columns', 0)]
+            for _, ds in missing
+        ], dtype=float)
+        if method == 'naive':
+            impacts = [naive_impact(size_mb) for size_mb in X[:, 0]]
+        else:
+            if index is not None and index["impact_model"] is not None:
+                impacts = predict_impacts(index["impact_model"], X)
+            else:
+                impacts = ["normal"] * len(missing)
+                explanation = "Not enough catalog data for clustering."
+        for (i, ds), impact in zip(missing, impacts):
+            results[i] = {"id": ds.get("id"), "impact": impact, "explanation": explanation}
+
+    return results
+
+def query_similar(dataset_id: str, k: int = 10) -> Optional[List[dict]]:
+    """Return the k nearest catalog neighbours of a dataset, or None if unknown."""
+    results = query_similar_batch([dataset_id], k)
+    return results[0]
+
+def query_similar_batch(dataset_ids: List[str], k: int = 10, index: Optional[dict] = None) -> List[Optional[List[dict]]]:
+    """Answer several nearest-neighbour queries with a single tree traversal.
+
+    Each entry in the returned list is None when the corresponding id is not
+    in the catalog, otherwise a list of {"id", "distance"} dicts nearest first.
+    Pass index to query a fixed snapshot.
+    """
+    if index is None:
+        index = _catalog["index"]
+    results = [None] * len(dataset_ids)
+    if index is None or index["tree"] is None:
+        return results
+
+    known = [(i, index["positions"][dataset_id]) for i, dataset_id in enumerate(dataset_ids)
+             if dataset_id in index["positions"]]
+    if not known:
+        return results
+
+    # Ask for one extra neighbour since each point is its own nearest match
+    n_neighbors = min(k + 1, len(index["ids"]))
+    rows = index["X"][[pos for _, pos in known]]
+    distances, neighbors = index["tree"].query(rows, k=n_neighbors)
+
+    for (i, pos), dist_row, neighbor_row in zip(known, distances, neighbors):
+        similar = []
+        for distance, neighbor in zip(dist_row, neighbor_row):
+            if neighbor == pos:
+                continue
+            similar.append({"id": index["ids"][neighbor], "distance": float(distance)})
+        results[i] = similar[:k]
+    return results
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Query, Body, status
+from sqlmodel import Session, select
+from database import engine
+from models import ImpactJob, ImpactJobResult
+from auth.routes import ImpactRequest, get_hf_datasets
+from catalog import IMPACT_METHODS, get_catalog_index
+from .worker import IMPACT_JOB_CHUNK_SIZE, resume_pending_jobs, submit_impact_job
+
+router = APIRouter(tags=["jobs"])
+
+def _get_job(session: Session, job_id: str) -> ImpactJob:
+    job = session.get(ImpactJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def resume_jobs_after_catalog_load():
+    """Load the catalog, then requeue pending jobs, including ones a previous process left behind."""
+    try:
+        await get_hf_datasets()
+    except Exception as e:
+        print(f"[JOBS] Catalog load failed, unfinished impact jobs stay pending: {e}")
+        return
+    resume_pending_jobs()
+
+@router.post("/auth/datasets/impact/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_impact_assessment(data: ImpactRequest = Body(...)):
+    if data.method not in IMPACT_METHODS:
+        raise HTTPException(status_code=400, detail="Unknown method. Use 'naive' or 'advanced'.")
+
+    # Load the catalog first so the job hash and scores use the current generation
+    if get_catalog_index() is None:
+        await get_hf_datasets()
+
+    job = submit_impact_job(data.datasets, data.method)
+    return {"job_id": job.id, "status": job.status}
+
+@router.get("/auth/datasets/impact/jobs/{job_id}")
+def get_impact_job_status(job_id: str):
+    with Session(engine) as session:
+        job = _get_job(session, job_id)
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "method": job.method,
+            "total": job.total,
+            "completed": job.completed,
+            "progress": job.completed / job.total if job.total else 1.0,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at,
+            "error": job.error,
+        }
+
+@router.get("/auth/datasets/impact/jobs/{job_id}/results")
+def get_impact_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    with Session(engine) as session:
+        job = _get_job(session, job_id)
+        if job.status != "done":
+            raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+        # Only read the chunks overlapping the requested page
+        chunks = session.exec(
+            select(ImpactJobResult).where(
+                (ImpactJobResult.job_id == job.id) &
+                (ImpactJobResult.start > offset - IMPACT_JOB_CHUNK_SIZE) &
+                (ImpactJobResult.start < offset + limit)
+            ).order_by(ImpactJobResult.start)
+        ).all()
+        results = []
+        for chunk in chunks:
+            chunk_results = chunk.get_results()
+            results.extend(chunk_results[max(offset - chunk.start, 0):offset + limit - chunk.start])
+        return {
+            "job_id": job.id,
+            "method": job.method,
+            "total": job.total,
+            "offset": offset,
+            "limit": limit,
+            "results": results,
+        }
@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select
+from sqlalchemy import delete, update
+from database import engine
+from models import ImpactJob, ImpactJobResult
+from catalog import get_catalog_index, score_impacts
+from dotenv import load_dotenv
+from datetime import datetime
+import threading
+import hashlib
+import json
+import os
+
+# Load environment variables
+load_dotenv()
+
+IMPACT_JOB_WORKERS = int(os.getenv("IMPACT_JOB_WORKERS", "2"))
+IMPACT_JOB_CHUNK_SIZE = 500  # datasets scored between progress updates
+
+# Local worker pool; jobs survive restarts through the impactjob table
+_executor = ThreadPoolExecutor(max_workers=IMPACT_JOB_WORKERS, thread_name_prefix="impact-job")
+_submit_lock = threading.Lock()
+
+def hash_impact_input(datasets: list, method: str) -> str:
+    """Content hash of a job's input."""
+    payload = json.dumps({"method": method, "datasets": datasets}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def submit_impact_job(datasets: list, method: str) -> ImpactJob:
+    """Queue an impact job, reusing a job with identical input for the current catalog.
+
+    Pending jobs have not been scored yet and are always reusable; running or
+    finished jobs only if they were scored against the catalog loaded now.
+    """
+    input_hash = hash_impact_input(datasets, method)
+    index = get_catalog_index()
+    fingerprint = index["fingerprint"] if index is not None else None
+    with _submit_lock, Session(engine) as session:
+        existing = session.exec(
+            select(ImpactJob).where(
+                (ImpactJob.input_hash == input_hash) &
+                (
+                    (ImpactJob.status == "pending") |
+                    (ImpactJob.status.in_(["running", "done"]) & (ImpactJob.catalog_fingerprint == fingerprint))
+                )
+            )
+        ).first()
+        if existing:
+            return existing
+        job = ImpactJob(
+            input_hash=input_hash,
+            method=method,
+            total=len(datasets),
+            datasets=json.dumps(datasets),
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+    _executor.submit(run_impact_job, job.id)
+    print(f"[JOBS] Queued impact job {job.id} ({job.total} datasets, {method})")
+    return job
+
+def run_impact_job(job_id: str):
+    # Every chunk is scored against the same catalog snapshot
+    index = get_catalog_index()
+    if index is None:
+        # Ids and advanced scores need the catalog; resume_pending_jobs
+        # picks the job up again once it is loaded
+        print(f"[JOBS] Catalog not loaded, impact job {job_id} left pending")
+        return
+    with Session(engine) as session:
+        # Claim the job atomically so a job submitted twice only runs once
+        claimed = session.execute(
+            update(ImpactJob)
+            .where((ImpactJob.id == job_id) & (ImpactJob.status == "pending"))
+            .values(status="running", completed=0, catalog_fingerprint=index["fingerprint"])
+        )
+        session.commit()
+        if claimed.rowcount != 1:
+            return
+        job = session.get(ImpactJob, job_id)
+        # Drop chunks written by an interrupted earlier run
+        session.execute(delete(ImpactJobResult).where(ImpactJobResult.job_id == job_id))
+        session.commit()
+
+        datasets = job.get_datasets()
+        method = job.method
+        try:
+            for start in range(0, len(datasets), IMPACT_JOB_CHUNK_SIZE):
+                results = score_impacts(datasets[start:start + IMPACT_JOB_CHUNK_SIZE], method, index)
+                chunk = ImpactJobResult(job_id=job_id, start=start)
+                chunk.set_results(results)
+                job.completed = start + len(results)
+                session.add(chunk)
+                session.add(job)
+                session.commit()
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"[JOBS] Impact job {job_id} failed: {e}")
+        job.finished_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+
+def reset_interrupted_jobs():
+    """Return jobs a previous process left running to pending.
+
+    Call before the app serves requests, while no job of this process can be running.
+    """
+    with Session(engine) as session:
+        reset = session.execute(
+            update(ImpactJob).where(ImpactJob.status == "running").values(status="pending", completed=0)
+        )
+        session.commit()
+    if reset.rowcount:
+        print(f"[JOBS] Reset {reset.rowcount} interrupted impact job(s) to pending")
+
+def resume_pending_jobs():
+    """Requeue pending jobs; ones already claimed by a worker are skipped when they run."""
+    with Session(engine) as session:
+        jobs = session.exec(
+            select(ImpactJob).where(ImpactJob.status == "pending")
+        ).all()
+        job_ids = [job.id for job in jobs]
+    for job_id in job_ids:
+        _executor.submit(run_impact_job, job_id)
+    if job_ids:
+        print(f"[JOBS] Resumed {len(job_ids)} impact job(s)")
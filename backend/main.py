@@ -1,11 +1,27 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
-from database import create_db_and_tables
+from database import create_db_and_tables, engine
 from models import User
 from auth.routes import router as auth_router
 from users.routes import router as users_router
+from jobs.routes import router as jobs_router, resume_jobs_after_catalog_load
+from jobs.worker import reset_interrupted_jobs
+from admission import AdmissionControlMiddleware, configure_threadpool, router as admission_router
+from profiling import (
+    PROFILING_TOKEN, ProfilingMiddleware, ProfiledJSONResponse, install_query_spans, instrument_routes,
+    router as profiling_router,
+)
+
+app = FastAPI(
+    title="FastAPI Auth",
+    default_response_class=ProfiledJSONResponse if PROFILING_TOKEN else JSONResponse,
+)
 
-app = FastAPI(title="FastAPI Auth")
+# Per route class admission control; added before CORS so shed responses
+# still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
 
 # Add CORS middleware here
 app.add_middleware(
@@ -16,13 +32,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per request profiling; outermost so queueing time is included.
+# Hooks are only installed when an admin token is configured.
+if PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+    install_query_spans(engine)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(users_router)
+app.include_router(jobs_router)
+app.include_router(admission_router)
+app.include_router(profiling_router)
+
+if PROFILING_TOKEN:
+    instrument_routes(app)
 
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    reset_interrupted_jobs()
+
+_background_tasks = set()
+
+@app.on_event("startup")
+async def size_threadpool():
+    configure_threadpool()
+
+@app.on_event("startup")
+async def resume_impact_jobs():
+    # Jobs are scored against the catalog, so load it in the background first
+    task = asyncio.create_task(resume_jobs_after_catalog_load())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 if __name__ == "__main__":
     import uvicorn
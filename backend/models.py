@@ -2,6 +2,7 @@ from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from datetime import datetime
 import json
+import uuid
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -29,4 +30,35 @@ class DatasetCombination(SQLModel, table=True):
         return json.loads(self.dataset_ids)
 
     def set_dataset_ids(self, ids: List[str]):
-        self.dataset_ids = json.dumps(ids) 
\ No newline at end of file
+        self.dataset_ids = json.dumps(ids)
+
+
+class ImpactJob(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex, primary_key=True)
+    input_hash: str = Field(index=True)  # sha256 of method + datasets
+    method: str
+    status: str = Field(default="pending")  # pending, running, done or failed
+    total: int = Field(default=0)
+    completed: int = Field(default=0)
+    datasets: str = Field(default="[]")  # Store as JSON string
+    error: Optional[str] = None
+    catalog_fingerprint: Optional[str] = None  # catalog the results were scored against
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def get_datasets(self) -> list:
+        return json.loads(self.datasets)
+
+
+class ImpactJobResult(SQLModel, table=True):
+    """One scored chunk of an impact job, so results can be read page by page."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: str = Field(foreign_key="impactjob.id", index=True)
+    start: int = Field(index=True)  # position of the chunk's first result in the job
+    results: str = Field(default="[]")  # Store as JSON string
+
+    def get_results(self) -> List[dict]:
+        return json.loads(self.results)
+
+    def set_results(self, results: List[dict]):
+        self.results = json.dumps(results)
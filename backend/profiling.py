@@ -0,0 +1,323 @@
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.routing import APIRoute, request_response
+from sqlalchemy import event
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from typing import Optional
+from urllib.parse import parse_qs
+import fastapi.routing
+import functools
+import threading
+import asyncio
+import hmac
+import uuid
+import time
+import sys
+import os
+
+# Load environment variables
+load_dotenv()
+
+# Profiling is disabled unless an admin token is configured
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_HEADER = "x-profile-token"  # carries the admin token
+PROFILE_QUERY_FLAG = "profile"  # ?profile=1 switches profiling on
+PROFILE_SAMPLE_INTERVAL = 0.001  # seconds between stack samples
+PROFILE_MAX_STORED = 50
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+_profiles = OrderedDict()
+
+def _is_admin_token(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN and token and hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode()))
+
+class RequestProfile:
+    """Stack samples and spans collected for a single profiled request.
+
+    A thread is sampled only while one of this request's sampled spans is
+    open on it, so samples never include other requests' work. Endpoints are
+    wrapped in such a span by instrument_routes(); async code is sampled
+    only between its awaits.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.samples = Counter()
+        self.spans = []
+        self._thread_spans = {}
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id[:8]}", daemon=True)
+
+    def push_span(self, thread_id: int, name: str):
+        self._thread_spans.setdefault(thread_id, []).append(name)
+
+    def pop_span(self, thread_id: int):
+        active_spans = self._thread_spans[thread_id]
+        active_spans.pop()
+        if not active_spans:
+            # Stop sampling the thread once this request no longer runs on it
+            del self._thread_spans[thread_id]
+
+    def record_span(self, name: str, start: float, end: float, sampled: bool):
+        self.spans.append({
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            "sampled": sampled,
+        })
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def _sample(self):
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL):
+            frames = sys._current_frames()
+            for thread_id, active_spans in list(self._thread_spans.items()):
+                # Copy before walking the stack; the span may close meanwhile
+                prefix = [f"[{name}]" for name in list(active_spans)]
+                if not prefix:
+                    continue
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                # Prefix with the open spans so samples roll up under them
+                self.samples[";".join(prefix + stack)] += 1
+
+    def folded(self) -> str:
+        """Samples in collapsed-stack format (flamegraph.pl, speedscope)."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.items())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "duration_ms": self.duration_ms,
+            "sample_count": sum(self.samples.values()),
+            "sample_interval_ms": PROFILE_SAMPLE_INTERVAL * 1000,
+            "spans": self.spans,
+        }
+
+class span:
+    """Attribute time inside the block to a named span of the active profile.
+
+    Pass sampled=False for blocks that await, since other coroutines run on
+    the thread meanwhile; they then only record their duration. A no-op
+    beyond one context variable lookup when the request is not profiled.
+    """
+
+    __slots__ = ("name", "sampled", "profile", "thread_id", "start")
+
+    def __init__(self, name: str, sampled: bool = True):
+        self.name = name
+        self.sampled = sampled
+        self.profile = None
+
+    def __enter__(self):
+        profile = _active_profile.get()
+        if profile is not None:
+            self.profile = profile
+            self.thread_id = threading.get_ident()
+            if self.sampled:
+                profile.push_span(self.thread_id, self.name)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profile = self.profile
+        if profile is not None:
+            end = time.perf_counter()
+            if self.sampled:
+                profile.pop_span(self.thread_id)
+            profile.record_span(self.name, self.start, end, self.sampled)
+        return False
+
+class _Suspend:
+    """Awaitable that passes a value yielded by a wrapped coroutine on to the event loop."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __await__(self):
+        return (yield self.value)
+
+async def run_sampled(coro, name: str):
+    """Await coro, sampling its thread under a span only while it runs.
+
+    The coroutine is stepped by hand so the span is closed whenever it is
+    suspended at an await and other coroutines have the event loop.
+    """
+    profile = _active_profile.get()
+    if profile is None:
+        return await coro
+    thread_id = threading.get_ident()
+    start = time.perf_counter()
+    send_value, error = None, None
+    try:
+        while True:
+            profile.push_span(thread_id, name)
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(send_value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                profile.pop_span(thread_id)
+            try:
+                send_value, error = await _Suspend(yielded), None
+            except BaseException as e:
+                send_value, error = None, e
+    finally:
+        profile.record_span(name, start, time.perf_counter(), True)
+
+def _profiled_endpoint(call, name: str):
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(**kwargs):
+            return await run_sampled(call(**kwargs), name)
+    else:
+        # Runs inside the threadpool thread that executes the sync endpoint
+        @functools.wraps(call)
+        def endpoint(**kwargs):
+            with span(name):
+                return call(**kwargs)
+    return endpoint
+
+def instrument_routes(app):
+    """Put endpoint bodies and response serialization of profiled requests in sampled spans.
+
+    Only call this when PROFILING_TOKEN is set; unprofiled deployments then
+    keep FastAPI's own handlers untouched.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "_profiled", False):
+            route.dependant.call = _profiled_endpoint(route.dependant.call, route.name)
+            route.dependant.call._profiled = True
+            route.app = request_response(route.get_route_handler())
+
+    # jsonable_encoder runs in serialize_response, before render()
+    serialize_response = fastapi.routing.serialize_response
+    if not getattr(serialize_response, "_profiled", False):
+        @functools.wraps(serialize_response)
+        async def profiled_serialize_response(**kwargs):
+            return await run_sampled(serialize_response(**kwargs), "json_encoding")
+        profiled_serialize_response._profiled = True
+        fastapi.routing.serialize_response = profiled_serialize_response
+
+def install_query_spans(engine):
+    """Record every DB query run during a profiled request as its own span.
+
+    Only install this when PROFILING_TOKEN is set, so unprofiled
+    deployments pay nothing per query.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _active_profile.get() is not None:
+            query_span = span("db: " + " ".join(statement.split())[:80])
+            query_span.__enter__()
+            conn.info.setdefault("profile_spans", []).append(query_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        query_spans = conn.info.get("profile_spans")
+        if query_spans:
+            query_spans.pop().__exit__(None, None, None)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        conn = context.connection
+        query_spans = conn.info.get("profile_spans") if conn is not None else None
+        if query_spans:
+            query_spans.pop().__exit__(None, None, None)
+
+class ProfiledJSONResponse(JSONResponse):
+    """JSONResponse whose json.dumps step shows up as a span in request profiles."""
+
+    def render(self, content) -> bytes:
+        with span("json_render"):
+            return super().render(content)
+
+class ProfilingMiddleware:
+    """Profile a single request flagged with ?profile=1 that carries the admin token header.
+
+    The token is never accepted in the URL, so it stays out of access logs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILING_TOKEN:
+            return await self.app(scope, receive, send)
+        if not self._requested(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.stop()
+            _active_profile.reset(token)
+            _profiles[profile.id] = profile
+            while len(_profiles) > PROFILE_MAX_STORED:
+                _profiles.popitem(last=False)
+            print(f"[PROFILE] {profile.method} {profile.path} took {profile.duration_ms:.1f}ms, profile {profile.id}")
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get(PROFILE_QUERY_FLAG, [None])[0] != "1":
+            return False
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode():
+                return _is_admin_token(value.decode("latin-1"))
+        return False
+
+router = APIRouter(tags=["profiling"])
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("folded"),
+    x_profile_token: Optional[str] = Header(None),
+):
+    if not _is_admin_token(x_profile_token):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+    profile = _profiles.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format not in ("folded", "json"):
+        raise HTTPException(status_code=400, detail="Unknown format. Use 'folded' or 'json'.")
+    if format == "json":
+        return profile.summary()
+    return PlainTextResponse(profile.folded())
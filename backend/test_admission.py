@@ -0,0 +1,120 @@
+import asyncio
+
+import anyio
+import pytest
+
+import admission
+import auth.routes
+from admission import AdaptiveLimiter, THREADPOOL_TOKENS, classify_route, configure_threadpool
+
+
+def make_limiter(**overrides):
+    settings = {"max_concurrency": 2, "min_concurrency": 1, "max_queue": 1,
+                "queue_timeout": 0.05, "target_latency": 0.1, "shed_status": 503}
+    settings.update(overrides)
+    return AdaptiveLimiter(**settings)
+
+
+def test_admits_up_to_limit_then_queues_and_hands_over():
+    async def scenario():
+        limiter = make_limiter(queue_timeout=1.0)
+        assert await limiter.acquire()
+        assert await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth"] == 1
+        limiter.release(0.01)
+        assert await waiter
+        assert limiter.in_flight == 2
+        assert limiter.stats()["queue_depth"] == 0
+    asyncio.run(scenario())
+
+
+def test_sheds_when_queue_full_or_wait_times_out():
+    async def scenario():
+        limiter = make_limiter()
+        await limiter.acquire()
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()
+        assert not await queued
+        stats = limiter.stats()
+        assert (stats["shed_queue_full"], stats["shed_timeout"]) == (1, 1)
+        assert limiter.in_flight == 2
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue_without_leaking_slots():
+    async def scenario():
+        limiter = make_limiter(queue_timeout=1.0)
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.stats()["queue_depth"] == 0
+        limiter.release(0.01)
+        limiter.release(0.01)
+        assert limiter.in_flight == 0
+    asyncio.run(scenario())
+
+
+def test_cancel_racing_handover_keeps_slot_accounting():
+    async def scenario():
+        limiter = make_limiter(queue_timeout=1.0)
+        await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # Slot is handed to the waiter, which is cancelled before it resumes
+        limiter.release(0.01)
+        waiter.cancel()
+        try:
+            admitted = await waiter
+        except asyncio.CancelledError:
+            admitted = False
+        assert limiter.in_flight == (2 if admitted else 1)
+    asyncio.run(scenario())
+
+
+def test_limit_shrinks_on_slow_requests_and_recovers():
+    async def scenario():
+        limiter = make_limiter(max_concurrency=10, min_concurrency=2)
+        for _ in range(30):
+            await limiter.acquire()
+            limiter.release(1.0)
+        assert int(limiter.limit) == 2
+        for _ in range(200):
+            await limiter.acquire()
+            limiter.release(0.001)
+        assert int(limiter.limit) == 10
+    asyncio.run(scenario())
+
+
+def test_catalog_refresh_routes_are_compute_until_fresh(monkeypatch):
+    monkeypatch.setattr(auth.routes, "_hf_cache", {"data": None, "timestamp": 0})
+    assert classify_route("GET", "/auth/datasets") == "compute"
+    assert classify_route("GET", "/datasets/org/name/similar") == "compute"
+    monkeypatch.setattr(auth.routes, "_hf_cache", {"data": [{"id": "a"}], "timestamp": 1e12})
+    assert classify_route("GET", "/auth/datasets") == "cache-read"
+    assert classify_route("GET", "/auth/datasets/cache_status") == "cache-read"
+    assert classify_route("GET", "/admission/stats") == "cache-read"
+    assert classify_route("POST", "/auth/login") == "auth-cpu"
+
+
+def test_threadpool_sized_to_admission_caps():
+    async def scenario():
+        configure_threadpool()
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+    assert asyncio.run(scenario()) == THREADPOOL_TOKENS
+
+
+def test_job_submit_is_db_write_once_catalog_is_loaded(monkeypatch):
+    monkeypatch.setattr(admission, "get_catalog_index", lambda: None)
+    assert classify_route("POST", "/auth/datasets/impact/jobs") == "compute"
+    monkeypatch.setattr(admission, "get_catalog_index", lambda: {"generation": 1})
+    assert classify_route("POST", "/auth/datasets/impact/jobs") == "db-write"
+    assert classify_route("POST", "/auth/datasets/impact") == "compute"
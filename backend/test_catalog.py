@@ -0,0 +1,56 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import auth.routes
+import catalog
+from auth.routes import ImpactRequest, assess_impact
+from catalog import build_catalog_index, query_similar, query_similar_batch, score_impacts
+
+
+@pytest.fixture
+def loaded_catalog(monkeypatch):
+    monkeypatch.setattr(catalog, "_catalog", {"index": None, "generation": 0})
+    rng = np.random.default_rng(0)
+    datasets, features = [], []
+    for i in range(50):
+        row = [float(rng.uniform(10, 2000)), int(rng.integers(1000, 1000000)), int(rng.integers(5, 100))]
+        datasets.append({"id": f"ds{i}", "downloads": i, "likes": i % 7,
+                         "size_mb": row[0], "num_rows": row[1], "num_columns": row[2]})
+        features.append(row)
+    return build_catalog_index(datasets, features)
+
+
+def test_catalog_ids_resolve_from_precomputed_scores(loaded_catalog):
+    results = score_impacts(["ds0", "ds1", "missing"], "advanced")
+    assert [r["impact"] for r in results[:2]] == loaded_catalog["impacts"]["advanced"][:2]
+    assert results[2]["impact"] is None
+
+
+def test_feature_dicts_score_against_catalog_clusters(loaded_catalog):
+    rows = [{"id": "new", "size_mb": 50, "num_rows": 10, "num_columns": 2},
+            {"id": "huge", "size_mb": 1e6, "num_rows": 1e9, "num_columns": 1e4}]
+    advanced = score_impacts(rows, "advanced")
+    assert advanced[1]["impact"] == "high impact"
+    # Scores do not depend on which other rows were submitted
+    assert score_impacts(rows[:1], "advanced")[0]["impact"] == advanced[0]["impact"]
+    assert [r["impact"] for r in score_impacts(rows, "naive")] == ["low", "high"]
+
+
+def test_similar_excludes_self_and_batches(loaded_catalog):
+    similar = query_similar("ds3", k=5)
+    assert len(similar) == 5
+    assert "ds3" not in [match["id"] for match in similar]
+    assert query_similar_batch(["ds3", "unknown"], k=5) == [similar, None]
+
+
+def test_naive_feature_dicts_do_not_load_catalog(monkeypatch):
+    monkeypatch.setattr(catalog, "_catalog", {"index": None, "generation": 0})
+
+    async def unreachable():
+        raise AssertionError("catalog fetched")
+    monkeypatch.setattr(auth.routes, "get_hf_datasets", unreachable)
+
+    response = asyncio.run(assess_impact(ImpactRequest(datasets=[{"id": "x", "size_mb": 50}], method="naive")))
+    assert response["results"][0]["impact"] == "low"
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+import catalog
+import jobs.routes
+import jobs.worker
+from catalog import build_catalog_index
+from jobs.routes import get_impact_job_results, get_impact_job_status
+from jobs.worker import reset_interrupted_jobs, resume_pending_jobs, submit_impact_job
+from models import ImpactJob
+
+
+class InlineExecutor:
+    """Runs submitted jobs immediately, or holds them when paused."""
+
+    def __init__(self):
+        self.paused = False
+        self.held = []
+
+    def submit(self, fn, *args):
+        if self.paused:
+            self.held.append((fn, args))
+        else:
+            fn(*args)
+
+
+def load_catalog(seed):
+    rng = np.random.default_rng(seed)
+    datasets, features = [], []
+    for i in range(20):
+        row = [float(rng.uniform(10, 2000)), int(rng.integers(1000, 1000000)), int(rng.integers(5, 100))]
+        datasets.append({"id": f"ds{i}", "downloads": i, "likes": 0})
+        features.append(row)
+    return build_catalog_index(datasets, features)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(jobs.worker, "engine", engine)
+    monkeypatch.setattr(jobs.routes, "engine", engine)
+    monkeypatch.setattr(catalog, "_catalog", {"index": None, "generation": 0})
+    inline = InlineExecutor()
+    monkeypatch.setattr(jobs.worker, "_executor", inline)
+    return inline
+
+
+def test_identical_input_reuses_job_for_same_catalog(executor):
+    load_catalog(0)
+    first = submit_impact_job(["ds1", "ds2"], "advanced")
+    assert get_impact_job_status(first.id)["status"] == "done"
+    assert submit_impact_job(["ds1", "ds2"], "advanced").id == first.id
+    assert submit_impact_job(["ds1", "ds2"], "naive").id != first.id
+
+
+def test_done_job_from_another_catalog_is_not_reused(executor):
+    load_catalog(0)
+    first = submit_impact_job(["ds1"], "advanced")
+    # Same generation number after a restart, but different catalog content
+    catalog._catalog.update({"index": None, "generation": 0})
+    load_catalog(1)
+    assert submit_impact_job(["ds1"], "advanced").id != first.id
+
+
+def test_job_waits_for_catalog_before_scoring(executor):
+    executor.paused = True
+    load_catalog(0)
+    job = submit_impact_job(["ds1", "unknown"], "naive")
+    catalog._catalog["index"] = None
+    fn, args = executor.held.pop()
+    fn(*args)
+    assert get_impact_job_status(job.id)["status"] == "pending"
+
+    executor.paused = False
+    load_catalog(0)
+    resume_pending_jobs()
+    status = get_impact_job_status(job.id)
+    assert status["status"] == "done"
+    assert status["completed"] == 2
+
+
+def test_results_are_paged(executor):
+    load_catalog(0)
+    job = submit_impact_job([f"ds{i}" for i in range(10)], "naive")
+    page = get_impact_job_results(job.id, offset=4, limit=3)
+    assert page["total"] == 10
+    assert [r["id"] for r in page["results"]] == ["ds4", "ds5", "ds6"]
+
+
+def test_results_of_unfinished_job_conflict(executor):
+    executor.paused = True
+    load_catalog(0)
+    job = submit_impact_job(["ds1"], "naive")
+    with pytest.raises(HTTPException) as exc:
+        get_impact_job_results(job.id, offset=0, limit=10)
+    assert exc.value.status_code == 409
+
+
+def test_job_submitted_twice_to_workers_runs_once(executor, monkeypatch):
+    executor.paused = True
+    load_catalog(0)
+    job = submit_impact_job(["ds1"], "naive")
+    runs = []
+    original = jobs.worker.score_impacts
+    monkeypatch.setattr(jobs.worker, "score_impacts", lambda *args: runs.append(1) or original(*args))
+    # Startup resume requeues the same pending job the submit already queued
+    executor.paused = False
+    resume_pending_jobs()
+    fn, args = executor.held.pop()
+    fn(*args)
+    assert len(runs) == 1
+    assert get_impact_job_status(job.id)["status"] == "done"
+
+
+def test_interrupted_running_jobs_are_reset_and_resumed(executor):
+    executor.paused = True
+    load_catalog(0)
+    job = submit_impact_job(["ds1"], "naive")
+    with Session(jobs.worker.engine) as session:
+        row = session.get(ImpactJob, job.id)
+        row.status = "running"
+        session.add(row)
+        session.commit()
+    reset_interrupted_jobs()
+    assert get_impact_job_status(job.id)["status"] == "pending"
+    executor.paused = False
+    resume_pending_jobs()
+    assert get_impact_job_status(job.id)["status"] == "done"
+
+
+def test_pages_spanning_chunks(executor, monkeypatch):
+    monkeypatch.setattr(jobs.worker, "IMPACT_JOB_CHUNK_SIZE", 4)
+    monkeypatch.setattr(jobs.routes, "IMPACT_JOB_CHUNK_SIZE", 4)
+    load_catalog(0)
+    job = submit_impact_job([f"ds{i}" for i in range(10)], "naive")
+    page = get_impact_job_results(job.id, offset=3, limit=6)
+    assert [r["id"] for r in page["results"]] == [f"ds{i}" for i in range(3, 9)]
+    assert get_impact_job_results(job.id, offset=8, limit=100)["results"][-1]["id"] == "ds9"
+    assert get_impact_job_results(job.id, offset=20, limit=5)["results"] == []
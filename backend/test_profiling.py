@@ -0,0 +1,84 @@
+import threading
+import time
+
+import profiling
+from profiling import ProfilingMiddleware, RequestProfile, _active_profile, span
+
+
+def test_threads_are_sampled_only_inside_sync_spans():
+    profile = RequestProfile("GET", "/auth/datasets")
+    token = _active_profile.set(profile)
+    profile.start()
+    try:
+        with span("hf_fetch", sampled=False):
+            assert profile._thread_spans == {}
+        with span("kmeans"):
+            assert threading.get_ident() in profile._thread_spans
+            time.sleep(0.05)
+        assert profile._thread_spans == {}
+    finally:
+        profile.stop()
+        _active_profile.reset(token)
+
+    assert [(s["name"], s["sampled"]) for s in profile.spans] == [("hf_fetch", False), ("kmeans", True)]
+    assert profile.samples
+    assert all(stack.startswith("[kmeans];") for stack in profile.samples)
+
+
+def test_span_is_noop_without_active_profile():
+    with span("kmeans") as s:
+        assert s.profile is None
+
+
+def test_profiling_needs_query_switch_and_admin_header(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    header = [(b"x-profile-token", b"secret")]
+    requested = ProfilingMiddleware._requested
+    assert requested({"query_string": b"profile=1", "headers": header})
+    assert not requested({"query_string": b"", "headers": header})
+    assert not requested({"query_string": b"profile=secret", "headers": []})
+    assert not requested({"query_string": b"profile=1", "headers": [(b"x-profile-token", b"wrong")]})
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_instrumented_endpoints_are_sampled(monkeypatch):
+    import asyncio
+    import fastapi.routing
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    # instrument_routes wraps FastAPI's serializer; restore it afterwards
+    monkeypatch.setattr(fastapi.routing, "serialize_response", fastapi.routing.serialize_response)
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_endpoint():
+        _busy(0.05)
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_endpoint():
+        _busy(0.05)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware)
+    profiling.instrument_routes(app)
+    client = TestClient(app)
+
+    for path, name in (("/sync", "sync_endpoint"), ("/async", "async_endpoint")):
+        response = client.get(path, params={"profile": "1"}, headers={"x-profile-token": "secret"})
+        assert response.json() == {"ok": True}
+        profile = profiling._profiles[response.headers["x-profile-id"]]
+        busy_samples = sum(count for stack, count in profile.samples.items() if "_busy" in stack)
+        assert busy_samples
+        assert all(stack.startswith(f"[{name}]") or stack.startswith("[json_encoding]") for stack in profile.samples)
+        assert {s["name"] for s in profile.spans} >= {name, "json_encoding"}
+        # The event loop waiting on asyncio.sleep is not attributed to the endpoint
+        assert not any("select (selectors.py" in stack for stack in profile.samples)
@@ -0,0 +1,45 @@
+from users.cache import UserViewCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = UserViewCache(max_size=2)
+    for user_id in (1, 2):
+        cache.put("followed", user_id, 1, cache.version("followed", user_id), [user_id])
+    assert cache.get("followed", 1, 1) == [1]
+    cache.put("followed", 3, 1, cache.version("followed", 3), [3])
+    assert cache.get("followed", 2, 1) is None
+    assert cache.get("followed", 1, 1) == [1]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_other_generation_is_a_miss():
+    cache = UserViewCache(max_size=4)
+    cache.put("combinations", 1, 1, cache.version("combinations", 1), ["a"])
+    assert cache.get("combinations", 1, 2) is None
+
+
+def test_invalidate_drops_entry_and_rejects_racing_read():
+    cache = UserViewCache(max_size=4)
+    cache.put("followed", 1, 1, cache.version("followed", 1), ["old"])
+    # A read starts, then a write invalidates before the read stores its result
+    version = cache.version("followed", 1)
+    cache.invalidate("followed", 1)
+    assert cache.get("followed", 1, 1) is None
+    cache.put("followed", 1, 1, version, ["stale"])
+    assert cache.get("followed", 1, 1) is None
+    cache.put("followed", 1, 1, cache.version("followed", 1), ["fresh"])
+    assert cache.get("followed", 1, 1) == ["fresh"]
+
+
+def test_versions_are_bounded_and_still_reject_racing_reads():
+    cache = UserViewCache(max_size=2)
+    version = cache.version("followed", 1)
+    cache.invalidate("followed", 1)
+    for user_id in range(2, 10):
+        cache.invalidate("followed", user_id)
+    assert len(cache._versions) == 2
+    # User 1's version was evicted, but the read that began before it is still stale
+    cache.put("followed", 1, 1, version, ["stale"])
+    assert cache.get("followed", 1, 1) is None
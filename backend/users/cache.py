@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Any, Optional
+import threading
+import os
+
+# Load environment variables
+load_dotenv()
+
+USER_VIEW_CACHE_SIZE = int(os.getenv("USER_VIEW_CACHE_SIZE", "1024"))
+
+class UserViewCache:
+    """Bounded LRU cache of fully enriched per-user views.
+
+    Entries are keyed by (view, user_id) and tagged with the catalog
+    generation they were built against, so a catalog refresh turns them into
+    misses. Write routes call invalidate(); a version per key stops a read
+    that raced with the write from caching its stale result. Versions are
+    bounded like the entries: evicted keys fall back to the highest evicted
+    version, which still rejects any read that started before the eviction.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._version_clock = 0
+        self._version_floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, view: str, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get((view, user_id), self._version_floor)
+
+    def get(self, view: str, user_id: int, generation: int) -> Optional[Any]:
+        key = (view, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, view: str, user_id: int, generation: int, version: int, value: Any):
+        key = (view, user_id)
+        with self._lock:
+            if self._versions.get(key, self._version_floor) != version:
+                return
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, view: str, user_id: int):
+        key = (view, user_id)
+        with self._lock:
+            self._version_clock += 1
+            self._versions[key] = self._version_clock
+            self._versions.move_to_end(key)
+            while len(self._versions) > self.max_size:
+                _, evicted_version = self._versions.popitem(last=False)
+                self._version_floor = max(self._version_floor, evicted_version)
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+user_view_cache = UserViewCache(USER_VIEW_CACHE_SIZE)
@@ -1,15 +1,28 @@
 from models import FollowedDataset, DatasetCombination
 from sqlmodel import select, Session
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from auth.routes import get_current_user
 from database import engine
 from models import User
 from pydantic import BaseModel
-from auth.routes import _hf_cache
+from auth.routes import get_hf_datasets, is_catalog_fresh
+from catalog import get_catalog_index, query_similar, query_similar_batch
+from .cache import user_view_cache
 from typing import List, Optional
 
 router = APIRouter()
 
+SUGGESTIONS_PER_COMBINATION = 5
+
+def _catalog_lookup(index):
+    """Return (generation, id -> metadata lookup) for a catalog index snapshot."""
+    if index is None:
+        return 0, lambda dataset_id: None
+    positions, datasets = index["positions"], index["datasets"]
+    return index["generation"], lambda dataset_id: (
+        datasets[positions[dataset_id]] if dataset_id in positions else None
+    )
+
 class FollowRequest(BaseModel):
     dataset_id: str
 
@@ -37,31 +50,33 @@ def follow_dataset(
         session.add(follow)
         session.commit()
         session.refresh(follow)
+        user_view_cache.invalidate("followed", current_user.id)
         return {"message": "Dataset followed", "follow_id": follow.id}
 
 @router.get("/user/followed")
 def get_followed_datasets(current_user: User = Depends(get_current_user)):
+    # Catalog metadata and its generation come from the same index snapshot
+    generation, lookup = _catalog_lookup(get_catalog_index())
+    cached_result = user_view_cache.get("followed", current_user.id, generation)
+    if cached_result is not None:
+        return cached_result
+    version = user_view_cache.version("followed", current_user.id)
+
     with Session(engine) as session:
         follows = session.exec(
             select(FollowedDataset).where(FollowedDataset.user_id == current_user.id)
         ).all()
-        if not follows:
-            return []
-
-        # Get cached datasets
-        cached = _hf_cache["data"] or []
-        # Build a dict for fast lookup
-        cached_dict = {ds["id"]: ds for ds in cached}
 
         # Join followed datasets with cached metadata
         result = []
         for follow in follows:
-            meta = cached_dict.get(follow.dataset_id)
+            meta = lookup(follow.dataset_id)
             if meta:
                 result.append(meta)
             else:
                 # If not in cache, just return the id
                 result.append({"id": follow.dataset_id, "description": "No metadata (not in cache)"})
+        user_view_cache.put("followed", current_user.id, generation, version, result)
         return result
 
 @router.delete("/user/follow/{dataset_id}")
@@ -77,6 +92,7 @@ def unfollow_dataset(dataset_id: str, current_user: User = Depends(get_current_u
             raise HTTPException(status_code=404, detail="Not following this dataset")
         session.delete(follow)
         session.commit()
+        user_view_cache.invalidate("followed", current_user.id)
         return {"message": "Unfollowed"}
 
 @router.post("/datasets/combine")
@@ -95,25 +111,47 @@ def create_dataset_combination(
         session.add(combination)
         session.commit()
         session.refresh(combination)
+        user_view_cache.invalidate("combinations", current_user.id)
         return combination
 
 @router.get("/datasets/combinations")
 def get_user_combinations(current_user: User = Depends(get_current_user)):
+    # Metadata, suggestions and the cache tag all come from one index snapshot
+    index = get_catalog_index()
+    generation, lookup = _catalog_lookup(index)
+    cached_result = user_view_cache.get("combinations", current_user.id, generation)
+    if cached_result is not None:
+        return cached_result
+    version = user_view_cache.version("combinations", current_user.id)
+
     with Session(engine) as session:
         combinations = session.exec(
             select(DatasetCombination).where(DatasetCombination.user_id == current_user.id)
         ).all()
-        
-        # Get cached datasets for metadata
-        cached = _hf_cache["data"] or []
-        cached_dict = {ds["id"]: ds for ds in cached}
-        
+
+        # Parse each combination's JSON ids once
+        combo_ids_list = [combo.get_dataset_ids() for combo in combinations]
+
+        # One batched neighbour lookup covers every dataset in every combination
+        member_ids = list({dataset_id for combo_ids in combo_ids_list for dataset_id in combo_ids})
+        neighbours = dict(zip(member_ids, query_similar_batch(member_ids, SUGGESTIONS_PER_COMBINATION, index)))
+
         # Enrich combinations with dataset metadata
         result = []
-        for combo in combinations:
+        for combo, combo_ids in zip(combinations, combo_ids_list):
+            # Suggest the closest catalog datasets not already in the combination
+            best = {}
+            for dataset_id in combo_ids:
+                for match in neighbours.get(dataset_id) or []:
+                    if match["id"] in combo_ids:
+                        continue
+                    if match["id"] not in best or match["distance"] < best[match["id"]]:
+                        best[match["id"]] = match["distance"]
+            suggestions = sorted(best, key=best.get)[:SUGGESTIONS_PER_COMBINATION]
+
             enriched_datasets = []
-            for dataset_id in combo.get_dataset_ids():
-                meta = cached_dict.get(dataset_id)
+            for dataset_id in combo_ids:
+                meta = lookup(dataset_id)
                 if meta:
                     enriched_datasets.append(meta)
                 else:
@@ -124,7 +162,31 @@ def get_user_combinations(current_user: User = Depends(get_current_user)):
                 "name": combo.name,
                 "description": combo.description,
                 "created_at": combo.created_at,
-                "datasets": enriched_datasets
+                "datasets": enriched_datasets,
+                "suggestions": [
+                    lookup(dataset_id) or {"id": dataset_id} for dataset_id in suggestions
+                ]
             })
-        
+
+        user_view_cache.put("combinations", current_user.id, generation, version, result)
         return result
+
+@router.get("/datasets/{dataset_id:path}/similar", tags=["public"])
+async def get_similar_datasets(dataset_id: str, k: int = Query(10, ge=1, le=100)):
+    # Build the catalog (and its index) on first use or once it has expired
+    if get_catalog_index() is None or not is_catalog_fresh():
+        await get_hf_datasets()
+
+    index = get_catalog_index()
+    similar = query_similar(dataset_id, k)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Dataset not in catalog")
+
+    return [
+        {**index["datasets"][index["positions"][match["id"]]], "distance": match["distance"]}
+        for match in similar
+    ]
+
+@router.get("/user/cache_status")
+def user_cache_status():
+    return user_view_cache.stats()